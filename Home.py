@@ -13,7 +13,7 @@ from functools import partial
 from streamlit_card import card
 
 # Import user modules
-from utils import refresh_data_pipeline, load_and_encode_image, switch_to
+from utils import refresh_data_pipeline, load_and_encode_image, switch_to, get_snapshot_version, rollback_snapshot
 from styles import apply_gradient_background
 
 # Setting page formats
@@ -55,6 +55,17 @@ with col2:
     if st.session_state.last_refresh:
         st.caption(f"Last refreshed: {st.session_state.last_refresh}")
 
+    # Roll Back Data Button
+    if st.button("↩️ Roll Back Data", help="Click to restore the previous version of your processed activities data"):
+        try:
+            st.success(f"✅ Data rolled back to version {rollback_snapshot()}.")
+        except ValueError as e:
+            st.error(f"❌ {e}")
+
+    # Display current data version
+    if get_snapshot_version():
+        st.caption(f"Data version: {get_snapshot_version()}")
+
 ##########################
 ### PAGE PREVIEW CARDS ###
 ##########################
@@ -10,14 +10,14 @@ import pandas as pd
 import streamlit as st
 
 # Import the styling module
-from utils import filter_dataframe
+from utils import filter_dataframe, get_snapshot_version, load_snapshot_table
 from styles import apply_gradient_background
 
 # Apply styling for this data page
 apply_gradient_background()
 
-# Read in the cleaned activities data
-df = pd.read_csv("activities_data/cleaned_activities.csv")
+# Read in the cleaned activities data, pinned to the current snapshot
+df = load_snapshot_table("cleaned_activities", get_snapshot_version())
 
 # Formatting with the dataframe on the left, image ikon on the right
 col1, col2 = st.columns([6, 1])
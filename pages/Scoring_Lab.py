@@ -0,0 +1,78 @@
+"""
+scoring_lab.py
+v0.0.1, 10/19/2026
+Author: Alexander Netzley, anetzley@uw.edu
+
+This page provides an interactive what-if comparison of the Difficulty Score and hardest activities ranking under alternative scoring parameters.
+"""
+
+import pandas as pd
+import streamlit as st
+
+# Import the styling module
+from utils import filter_dataframe, compare_scoring_scenarios, get_snapshot_version, load_snapshot_table, DEFAULT_SCORING_PARAMS
+from styles import apply_gradient_background
+
+# Apply styling for this data page
+apply_gradient_background()
+
+@st.cache_data
+def load_cleaned_activities(version: str) -> pd.DataFrame:
+    """
+    Loads the cleaned activities data once per snapshot version, so each rescoring rerun works purely in memory.
+    """
+    return load_snapshot_table("cleaned_activities", version)
+
+# Read in the cleaned activities data, pinned to the current snapshot
+df = load_cleaned_activities(get_snapshot_version())
+
+st.title("Scoring Lab")
+
+num_scenarios = st.number_input("Number of scenarios", min_value=1, max_value=4, value=2, step=1)
+
+# Collect the scoring parameter overrides for each scenario
+scenarios = {}
+tabs = st.tabs([f"Scenario {i + 1}" for i in range(num_scenarios)])
+for i, tab in enumerate(tabs):
+    with tab:
+        label = st.text_input("Label", value="Current" if i == 0 else f"Scenario {i + 1}", key=f"label_{i}") or f"Scenario {i + 1}"
+        if label in scenarios:
+            st.warning(f"The label '{label}' is already used by another scenario, which this one will replace.")
+
+        overrides = {}
+
+        # Per sport type distance and elevation scalars
+        col1, col2 = st.columns(2)
+        for col, key, title in [(col1, "activities_distance_scalar", "Distance Scalar"),
+                                (col2, "activities_elevation_scalar", "Elevation Scalar")]:
+            with col:
+                st.markdown(f"**{title}**")
+                overrides[key] = {
+                    sport_type: st.number_input(sport_type, value=float(value), min_value=0.01, step=0.1, key=f"{key}_{sport_type}_{i}")
+                    for sport_type, value in DEFAULT_SCORING_PARAMS[key].items()
+                }
+
+        # Per activity partial adjustments
+        with st.expander("Partial Adjustments"):
+            for key in ["partial_scramble_adjustment", "partial_backpacking_adjustment",
+                        "partial_trail_run_adjustment", "partial_gravel_ride_adjustment"]:
+                st.markdown(f"**{key.replace('_', ' ').title()}**")
+                edited = st.data_editor(
+                    pd.DataFrame({
+                        "Activity Name": pd.Series(list(DEFAULT_SCORING_PARAMS[key].keys()), dtype=str),
+                        "Adjustment": pd.Series(list(DEFAULT_SCORING_PARAMS[key].values()), dtype=float),
+                    }),
+                    num_rows="dynamic",
+                    use_container_width=True,
+                    key=f"{key}_{i}",
+                ).dropna()
+
+                # Removed rows fall back to a neutral adjustment of 1
+                overrides[key] = {name: 1 for name in DEFAULT_SCORING_PARAMS[key]}
+                overrides[key].update(zip(edited["Activity Name"], edited["Adjustment"]))
+
+        scenarios[label] = overrides
+
+# Rescore all scenarios in one pass and display the comparison
+comparison = compare_scoring_scenarios(df, scenarios)
+st.dataframe(filter_dataframe(comparison), use_container_width=True)
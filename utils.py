@@ -9,6 +9,9 @@ This module provides helper functions for the StravaVision app.
 # Import packages
 import pandas as pd
 import os
+import json
+import shutil
+import tempfile
 import time
 import pickle
 import requests
@@ -30,6 +33,260 @@ import reverse_geocoder as rg
 # Import User Modules
 from config import STRAVA_CLIENT_ID, STRAVA_CLIENT_SECRET
 
+##########################
+### Scoring Parameters ###
+##########################
+# Default parameters used to compute the Difficulty Score. These are used by refresh_data_pipeline, and serve as the
+# baseline that rescore_activities / compare_scoring_scenarios overrides.
+DEFAULT_SCORING_PARAMS = {
+    # Hardcoded adjustments for activities with mixed types
+    "activities_distance_scalar": {
+        "Ride": 4,
+        "MountainBikeRide": 2.5,
+        "GravelRide": 3,
+        "Run": 1,
+        "TrailRun": 1,
+        "NordicSki": 1,
+        "Hike": 1#(4/3)
+    },
+
+    "activities_elevation_scalar": {
+        "Ride": 2,
+        "MountainBikeRide": 2,
+        "GravelRide": 2,
+        "Run": 2,
+        "TrailRun": 2,
+        "NordicSki": 2,
+        "Hike": 2
+    },
+
+    "partial_scramble_adjustment": { # Currently, 1 + (the percentage of mileage off trail rounded to nearest 0.1)
+        'Longs Peak & Mt. Meeker': 1.3,
+        "Andrew’s Glacier + Taylor + Hallett": 1.1,
+        'Black Peak': 1.2,
+        "Earl + Bean + Devil’s Head": 1.2,
+        "Mount Storm King": 1.1,
+        "Luahna Peak": 1.3
+    },
+
+    # Partial Backpacking adjustment ( currently, 1.10x the hike score for both distance and elevation) My pack is ~35lbs, vs ~15lb on a regular hike)
+    "partial_backpacking_adjustment": {
+        "Red Deer Lake - Day 1": 1.1,
+        "Red Deer Lake - Day 2": 1.1,
+        "Strawberry Point - Day 1": 1.1,
+        "Strawberry Point - Day 2": 1.1,
+        "Hannegan Peak + Copper Creek - Day 1": 1.075, # Peak without backpack
+        "Copper Creek - Day 2": 1.1,
+        "Devil’s Dome - Day 1": 1.1,
+        "Devil’s Dome - Day 2": 1.1,
+        "Devil’s Dome - Day 3": 1.075, # Peak without backpack
+        "Devil’s Dome - Day 4": 1.1
+    },
+
+    # Raw trail run fractions, converted to multipliers by update_ptra
+    "partial_trail_run_adjustment": {
+        # "Mt. Teneriffe + Mt. Si": 0.25,
+        # "Spray Park Loop": 0.5,
+        # "Oyster Dome Loop": 0.75,
+        # "Cutthroat Pass": 0.25,
+        # "Trappers Peak / Thornton Lakes": 0.25,
+        # "Trap Pass": 0.25,
+        # "Mailbox Peak": 0.5,
+        # "Goat Lake": 0.75,
+        # "Green Mountain": 0.75,
+        # "Granite Lake": 0.5,
+        # "Earl + Bean + Devil’s Head": 0.25,
+        # "Olallie & Talapus Lakes": 0.5,
+        # "Black Peak": 0.25,
+        # "McClellan Butte": 0.5
+    },
+
+    "partial_gravel_ride_adjustment": {
+         "BLOM / Island Lake": 2.5/(0.25*2.5 + 0.75*3),
+         "Island Lake": 2.5/(0.25*2.5 + 0.75*3),
+         "Waterloo + DTE": 2.5/(0.25*2.5 + 0.75*3),
+         "Thrilla + North Lake Washington": 3/(0.5*3 + 0.5*4),
+         "Duvall + Marckworth Forest": 3/(0.5*3 + 0.5*4)
+    },
+}
+
+def update_ptra(partial_trail_run_adjustment):
+    """
+    Converts the raw partial trail run fractions into distance score multipliers.
+
+    Args:
+        partial_trail_run_adjustment (dict): Activity name to fraction of the activity spent running.
+
+    Returns:
+        dict: Activity name to distance score multiplier.
+    """
+    updated_ptra = {}
+    for key, value in partial_trail_run_adjustment.items():
+        if value == 0.25:
+            # if the value is 0.25, this means it is designated as a hike and has already been scaled, so we need to unscale
+            updated_ptra[key] = (4/3)*(3/4 + value/4)
+        else:
+            # other values indicate that this is categorized as a TrailRun, meaning we need to scale down.
+            updated_ptra[key] = (3/4 + value/4)
+    return updated_ptra
+
+######################
+### Data Snapshots ###
+######################
+# The processed tables are published together as immutable, versioned snapshots (activities_data/snapshots/<version>/),
+# with a manifest pointing at the current version. Readers resolve the version once and read every table from that
+# snapshot, so a refresh running in the background can never expose a half-written file or a mix of old and new tables.
+DATA_DIR = "activities_data"
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+SNAPSHOT_MANIFEST = os.path.join(SNAPSHOT_DIR, "CURRENT.json")
+SNAPSHOT_RETENTION = 5
+
+def _write_snapshot_manifest(version: str):
+    """
+    Atomically points the snapshot manifest at the given version (write to a temp file, then rename over the manifest).
+
+    Args:
+        version (str): The snapshot version to make current.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, prefix=".CURRENT-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": version, "updated_at": datetime.now().isoformat()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, SNAPSHOT_MANIFEST)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def list_snapshot_versions() -> list:
+    """
+    Lists the published snapshot versions, oldest first.
+
+    Returns:
+        list: The snapshot versions.
+    """
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+
+    # In-progress snapshots are written to hidden temp directories, so only list the published ones
+    return sorted(
+        entry for entry in os.listdir(SNAPSHOT_DIR)
+        if not entry.startswith(".") and os.path.isdir(os.path.join(SNAPSHOT_DIR, entry))
+    )
+
+def get_snapshot_version():
+    """
+    Gets the version of the current snapshot from the manifest.
+
+    Returns:
+        str: The current snapshot version, or None if no snapshot has been published yet.
+    """
+    if not os.path.exists(SNAPSHOT_MANIFEST):
+        return None
+
+    with open(SNAPSHOT_MANIFEST) as f:
+        return json.load(f)["version"]
+
+def save_snapshot(tables: dict, retention: int = SNAPSHOT_RETENTION) -> str:
+    """
+    Publishes a set of tables as a new immutable snapshot and makes it the current version.
+
+    The tables are written to a hidden temp directory, which is renamed into place once complete, before the manifest
+    is atomically repointed at it. Older snapshots beyond the retention limit are then removed.
+
+    Args:
+        tables (dict): Mapping of table name (e.g. "cleaned_activities") to DataFrame.
+        retention (int): Number of snapshot versions to keep. Defaults to SNAPSHOT_RETENTION.
+
+    Returns:
+        str: The version of the new snapshot.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    tmp_dir = tempfile.mkdtemp(dir=SNAPSHOT_DIR, prefix=f".{version}-")
+    try:
+        for name, table in tables.items():
+            table.to_csv(os.path.join(tmp_dir, f"{name}.csv"), index=False)
+        os.rename(tmp_dir, os.path.join(SNAPSHOT_DIR, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _write_snapshot_manifest(version)
+    prune_snapshots(retention)
+
+    return version
+
+def prune_snapshots(retention: int = SNAPSHOT_RETENTION) -> list:
+    """
+    Removes the oldest snapshot versions beyond the retention limit. The current version is always kept.
+
+    Args:
+        retention (int): Number of snapshot versions to keep. Defaults to SNAPSHOT_RETENTION.
+
+    Returns:
+        list: The removed snapshot versions.
+    """
+    if retention < 1:
+        raise ValueError("retention must keep at least one snapshot version.")
+
+    current_version = get_snapshot_version()
+    versions = list_snapshot_versions()
+
+    removed = [version for version in versions[:-retention] if version != current_version]
+    for version in removed:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, version), ignore_errors=True)
+
+    return removed
+
+def rollback_snapshot(version: str = None) -> str:
+    """
+    Points the manifest back at an earlier snapshot version.
+
+    Args:
+        version (str): The version to roll back to. Defaults to None, which rolls back to the version before the current one.
+
+    Returns:
+        str: The version that is now current.
+    """
+    versions = list_snapshot_versions()
+    current_version = get_snapshot_version()
+
+    if version is None:
+        older_versions = [v for v in versions if current_version is None or v < current_version]
+        if not older_versions:
+            raise ValueError("There is no earlier snapshot version to roll back to.")
+        version = older_versions[-1]
+    elif version not in versions:
+        raise ValueError(f"Snapshot version '{version}' does not exist. Available versions: {versions}")
+
+    _write_snapshot_manifest(version)
+
+    return version
+
+def load_snapshot_table(name: str, version: str = None) -> pd.DataFrame:
+    """
+    Loads a table from a snapshot. Pass the same version to every read that must be consistent with the others.
+
+    Falls back to the flat csv in activities_data when no snapshot has been published yet.
+
+    Args:
+        name (str): The table name (e.g. "cleaned_activities").
+        version (str): The snapshot version to read from. Defaults to None, which reads the current version.
+
+    Returns:
+        pd.DataFrame: The table.
+    """
+    version = version or get_snapshot_version()
+
+    if version is None:
+        return pd.read_csv(os.path.join(DATA_DIR, f"{name}.csv"))
+
+    return pd.read_csv(os.path.join(SNAPSHOT_DIR, version, f"{name}.csv"))
+
 ###############
 ### Home.py ###
 ###############
@@ -136,88 +393,13 @@ def refresh_data_pipeline():
             "start_latlng"
         }]
         
-        # Hardcoded adjustments for activities with mixed types
-        activities_distance_scalar = {
-            "Ride": 4,
-            "MountainBikeRide": 2.5,
-            "GravelRide": 3,
-            "Run": 1,
-            "TrailRun": 1,
-            "NordicSki": 1,
-            "Hike": 1#(4/3)
-        }
-
-        activities_elevation_scalar = {
-            "Ride": 2,
-            "MountainBikeRide": 2,
-            "GravelRide": 2,
-            "Run": 2,
-            "TrailRun": 2,
-            "NordicSki": 2,
-            "Hike": 2
-        }
-
-        partial_scramble_adjustment = { # Currently, 1 + (the percentage of mileage off trail rounded to nearest 0.1)
-            'Longs Peak & Mt. Meeker': 1.3,
-            "Andrew’s Glacier + Taylor + Hallett": 1.1,
-            'Black Peak': 1.2,
-            "Earl + Bean + Devil’s Head": 1.2,
-            "Mount Storm King": 1.1,
-            "Luahna Peak": 1.3
-        }
-
-        # Partial Backpacking adjustment ( currently, 1.10x the hike score for both distance and elevation) My pack is ~35lbs, vs ~15lb on a regular hike)
-        partial_backpacking_adjustment = {
-            "Red Deer Lake - Day 1": 1.1,
-            "Red Deer Lake - Day 2": 1.1,
-            "Strawberry Point - Day 1": 1.1,
-            "Strawberry Point - Day 2": 1.1,
-            "Hannegan Peak + Copper Creek - Day 1": 1.075, # Peak without backpack
-            "Copper Creek - Day 2": 1.1,
-            "Devil’s Dome - Day 1": 1.1,
-            "Devil’s Dome - Day 2": 1.1,
-            "Devil’s Dome - Day 3": 1.075, # Peak without backpack
-            "Devil’s Dome - Day 4": 1.1
-        }
-
-        partial_trail_run_adjustment = {
-            # "Mt. Teneriffe + Mt. Si": 0.25,
-            # "Spray Park Loop": 0.5,
-            # "Oyster Dome Loop": 0.75,
-            # "Cutthroat Pass": 0.25,
-            # "Trappers Peak / Thornton Lakes": 0.25,
-            # "Trap Pass": 0.25,
-            # "Mailbox Peak": 0.5,
-            # "Goat Lake": 0.75,
-            # "Green Mountain": 0.75,
-            # "Granite Lake": 0.5,
-            # "Earl + Bean + Devil’s Head": 0.25,
-            # "Olallie & Talapus Lakes": 0.5,
-            # "Black Peak": 0.25,
-            # "McClellan Butte": 0.5
-        }
-
-        def update_ptra(partial_trail_run_adjustment):
-            updated_ptra = {}
-            for key, value in partial_trail_run_adjustment.items():
-                if value == 0.25:
-                    # if the value is 0.25, this means it is designated as a hike and has already been scaled, so we need to unscale
-                    updated_ptra[key] = (4/3)*(3/4 + value/4)
-                else:
-                    # other values indicate that this is categorized as a TrailRun, meaning we need to scale down.
-                    updated_ptra[key] = (3/4 + value/4)
-            return updated_ptra
-
-        updated_partial_trail_run_adjustment = update_ptra(partial_trail_run_adjustment)
-
-        partial_gravel_ride_adjustment = {
-             "BLOM / Island Lake": 2.5/(0.25*2.5 + 0.75*3),
-             "Island Lake": 2.5/(0.25*2.5 + 0.75*3),
-             "Waterloo + DTE": 2.5/(0.25*2.5 + 0.75*3),
-             "Thrilla + North Lake Washington": 3/(0.5*3 + 0.5*4),
-             "Duvall + Marckworth Forest": 3/(0.5*3 + 0.5*4)
-
-        }
+        # Scoring parameters (see DEFAULT_SCORING_PARAMS for the per-sport scalars and partial adjustments)
+        activities_distance_scalar = DEFAULT_SCORING_PARAMS["activities_distance_scalar"]
+        activities_elevation_scalar = DEFAULT_SCORING_PARAMS["activities_elevation_scalar"]
+        partial_scramble_adjustment = DEFAULT_SCORING_PARAMS["partial_scramble_adjustment"]
+        partial_backpacking_adjustment = DEFAULT_SCORING_PARAMS["partial_backpacking_adjustment"]
+        updated_partial_trail_run_adjustment = update_ptra(DEFAULT_SCORING_PARAMS["partial_trail_run_adjustment"])
+        partial_gravel_ride_adjustment = DEFAULT_SCORING_PARAMS["partial_gravel_ride_adjustment"]
 
         def convert_timestamp(timestamp):
             if isinstance(timestamp, datetime):
@@ -292,15 +474,16 @@ def refresh_data_pipeline():
                                             "location_country": "Country"
                                             }, inplace=True)
 
-        # Save the cleaned activities data
-        filtered_activities.to_csv("activities_data/cleaned_activities.csv", index=False)
-
-        # Execute the data processing for each page, saving each after
+        # Execute the data processing for each page
         hardest_overall_activities = process_hardest_activities(filtered_activities)
-        hardest_overall_activities.to_csv("activities_data/hardest_activities.csv", index=False)
-
         sky_log_activities = process_sky_log(filtered_activities)
-        sky_log_activities.to_csv("activities_data/sky_log_activities.csv", index=False)
+
+        # Publish all of the processed tables together as a single snapshot
+        save_snapshot({
+            "cleaned_activities": filtered_activities,
+            "hardest_activities": hardest_overall_activities,
+            "sky_log_activities": sky_log_activities,
+        })
         
         return True
         
@@ -455,3 +638,141 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
                     df = df[df[column].str.contains(user_text_input)]
 
     return df
+
+######################
+### Scoring_Lab.py ###
+######################
+def resolve_scoring_params(overrides: dict = None) -> dict:
+    """
+    Merges a set of scoring parameter overrides onto the defaults in DEFAULT_SCORING_PARAMS.
+
+    Each override dict is merged key by key into the matching default dict, so only the entries being tuned need to
+    be supplied (e.g. {"activities_distance_scalar": {"Ride": 3}}).
+
+    Args:
+        overrides (dict): Mapping of scoring parameter name to a dict of entries to override. Defaults to None.
+
+    Returns:
+        dict: The full set of scoring parameters.
+    """
+    params = {key: dict(value) for key, value in DEFAULT_SCORING_PARAMS.items()}
+
+    for key, value in (overrides or {}).items():
+        if key not in params:
+            raise KeyError(f"Unknown scoring parameter '{key}'. Expected one of {list(params)}.")
+        params[key].update(value)
+
+    return params
+
+def _lookup_matrix(column: pd.Series, adjustments: list) -> np.ndarray:
+    """
+    Builds an (activities x scenarios) matrix of multipliers by looking up each value of the column in each
+    adjustment dict, defaulting to 1 for values that are not present.
+
+    Args:
+        column (pd.Series): The column to look up (e.g. Sport Type or Activity Name).
+        adjustments (list): One adjustment dict per scenario.
+
+    Returns:
+        np.ndarray: Matrix of multipliers with one row per activity and one column per scenario.
+    """
+    # Look up each unique value once, then broadcast back out to the rows
+    codes, uniques = pd.factorize(column.fillna(""))
+    table = np.array([[adjustment.get(value, 1) for adjustment in adjustments] for value in uniques], dtype=float)
+    return table.reshape(len(uniques), len(adjustments))[codes]
+
+def score_scenarios(df: pd.DataFrame, scenarios: dict) -> dict:
+    """
+    Recomputes the difficulty score components for several sets of scoring parameters in one vectorized pass.
+
+    Only the cached columns of the cleaned activities data are used (distance, total_elevation_gain, Sport Type,
+    Activity Name and performance_capacity), so no Strava API call or geocoding is needed. The rounding matches
+    refresh_data_pipeline, so the default parameters reproduce the saved Difficulty Score.
+
+    Args:
+        df (pd.DataFrame): The cleaned activities DataFrame.
+        scenarios (dict): Mapping of scenario label to scoring parameter overrides (see resolve_scoring_params).
+
+    Returns:
+        dict: Mapping of score name (distance_score, elevation_score, difficulty_score_without_altitude,
+        difficulty_score) to an (activities x scenarios) matrix, with columns in the order of scenarios.
+    """
+    params = [resolve_scoring_params(overrides) for overrides in scenarios.values()]
+
+    def lookup(column, key, transform=lambda x: x):
+        return _lookup_matrix(df[column], [transform(p[key]) for p in params])
+
+    miles = (df["distance"].to_numpy(dtype=float) * 0.000621371)[:, None]
+    elevation_kft = (df["total_elevation_gain"].fillna(0).to_numpy(dtype=float) * 3.28084 * 0.001)[:, None]
+    performance_capacity = df["performance_capacity"].to_numpy(dtype=float)[:, None]
+    backpacking = lookup("Activity Name", "partial_backpacking_adjustment")
+
+    # Calculate the distance score (miles, adjusted for sport type, with the partial adjustments applied in turn)
+    distance_score = miles / lookup("Sport Type", "activities_distance_scalar")
+    distance_score = np.round(distance_score * lookup("Activity Name", "partial_gravel_ride_adjustment"), 2)
+    distance_score = np.round(distance_score * lookup("Activity Name", "partial_trail_run_adjustment", update_ptra), 2)
+    distance_score = np.round(distance_score * lookup("Activity Name", "partial_scramble_adjustment"), 2)
+    distance_score = np.round(distance_score * backpacking, 2)
+
+    # Calculate the elevation score
+    elevation_score = elevation_kft * lookup("Sport Type", "activities_elevation_scalar")
+    elevation_score = np.round(elevation_score * backpacking, 2)
+
+    # Calculate the combined difficulty score, adjusted for altitude performance capacity
+    difficulty_score_without_altitude = distance_score + elevation_score
+    difficulty_score = np.round(difficulty_score_without_altitude / performance_capacity, 2)
+
+    return {
+        "distance_score": distance_score,
+        "elevation_score": elevation_score,
+        "difficulty_score_without_altitude": difficulty_score_without_altitude,
+        "difficulty_score": difficulty_score,
+    }
+
+def rescore_activities(df: pd.DataFrame, overrides: dict = None) -> pd.DataFrame:
+    """
+    Recomputes the Difficulty Score of the cleaned activities for a single set of scoring parameters.
+
+    Args:
+        df (pd.DataFrame): The cleaned activities DataFrame.
+        overrides (dict): Scoring parameter overrides (see resolve_scoring_params). Defaults to None.
+
+    Returns:
+        pd.DataFrame: Copy of the DataFrame with the score columns replaced, ready for process_hardest_activities.
+    """
+    scores = score_scenarios(df, {"scenario": overrides})
+
+    df = df.copy()
+    for column, matrix in scores.items():
+        df[column] = matrix[:, 0]
+    df["Difficulty Score"] = df.pop("difficulty_score")
+
+    return df
+
+def compare_scoring_scenarios(df: pd.DataFrame, scenarios: dict) -> pd.DataFrame:
+    """
+    Compares the Difficulty Score and hardest activities ranking across several sets of scoring parameters.
+
+    Args:
+        df (pd.DataFrame): The cleaned activities DataFrame.
+        scenarios (dict): Mapping of scenario label to scoring parameter overrides (see resolve_scoring_params).
+
+    Returns:
+        pd.DataFrame: One row per activity with a score and rank column for each scenario, sorted by the first scenario.
+    """
+    # Filter out ski activities, matching process_hardest_activities
+    df = df[df['Sport Type'] != 'AlpineSki']
+
+    difficulty_scores = score_scenarios(df, scenarios)["difficulty_score"]
+
+    comparison = df[["Activity Name", "Date", "Sport Type", "Distance (miles)", "Total Elevation Gain (ft)"]].copy()
+    for i, label in enumerate(scenarios):
+        score = pd.Series(difficulty_scores[:, i], index=comparison.index)
+        comparison[f"Difficulty Score ({label})"] = score
+        comparison[f"Rank ({label})"] = score.rank(ascending=False, method="min").astype("Int64")
+
+    if scenarios:
+        first_label = next(iter(scenarios))
+        comparison = comparison.sort_values(by=f"Difficulty Score ({first_label})", ascending=False)
+
+    return comparison.reset_index(drop=True)